@@ -6,87 +6,273 @@ and produces a JSON-LD knowledge graph.
 """
 
 import argparse
-import base64
-import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from pathlib import Path
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 from markdown_it import MarkdownIt
 from markdown_it.tree import SyntaxTreeNode
 
 
 # GitHub API helpers
 
-def github_get(url, token=None):
-    """Simple GET with optional token auth and error handling."""
-    headers = {"Accept": "application/vnd.github+json"}
-    if token:
-        headers["Authorization"] = f"token {token}"
-    resp = requests.get(url, headers=headers, timeout=30)
+# One pooled session so every call to api.github.com reuses the same
+# keep-alive HTTPS connection instead of paying a fresh TLS handshake.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_SESSION.headers.update({"Accept": "application/vnd.github+json"})
+
+# On-disk cache of {url: {etag, last_modified, text}} for conditional requests.
+# A 304 reply is empty and does not count against the primary rate limit.
+CACHE_DIR = Path.home() / ".cache" / "frequenz-jsonld"
+ETAG_CACHE = CACHE_DIR / "etags.json"
+_etag_lock = threading.Lock()
+_etags = None
+
+def _load_etags():
+    global _etags
+    if _etags is None:
+        try:
+            _etags = orjson.loads(ETAG_CACHE.read_bytes())
+        except (OSError, ValueError):
+            _etags = {}
+        if not isinstance(_etags, dict):
+            _etags = {}  # valid JSON, but not a cache we wrote
+    return _etags
+
+def _save_etags(etags):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        ETAG_CACHE.write_bytes(orjson.dumps(etags))
+    except OSError:
+        pass  # the cache is only an optimisation
+
+def github_fetch(url, token=None, accept=None):
+    """GET returning the body text, with optional token auth, ETag revalidation and error handling."""
+    headers = {"Authorization": f"token {token}"} if token else {}
+    if accept:
+        headers["Accept"] = accept
+    # the same URL returns a different body per media type
+    key = f"{url} {accept}" if accept else url
+    with _etag_lock:
+        cached = _load_etags().get(key)
+    if isinstance(cached, dict) and isinstance(cached.get("text"), str):
+        if isinstance(cached.get("etag"), str):
+            headers["If-None-Match"] = cached["etag"]
+        if isinstance(cached.get("last_modified"), str):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    else:
+        cached = None
+
+    resp = _SESSION.get(url, headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        return cached["text"]
     resp.raise_for_status()
-    return resp.json()
+    text = resp.content.decode("utf-8")
+
+    etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    if etag or last_modified:
+        with _etag_lock:
+            etags = _load_etags()
+            etags[key] = {"etag": etag, "last_modified": last_modified, "text": text}
+            _save_etags(etags)
+    return text
+
+def github_get(url, token=None):
+    """GET a JSON API resource."""
+    return orjson.loads(github_fetch(url, token))
 
 def get_repo_info(owner, repo, token=None):
     return github_get(f"https://api.github.com/repos/{owner}/{repo}", token)
 
 def get_readme(owner, repo, token=None):
-    data = github_get(f"https://api.github.com/repos/{owner}/{repo}/readme", token)
-    return base64.b64decode(data["content"]).decode("utf-8")
+    # the raw media type returns the file itself, no JSON wrapper or base64
+    return github_fetch(
+        f"https://api.github.com/repos/{owner}/{repo}/readme", token,
+        accept="application/vnd.github.raw",
+    )
+
+# README file names tried in the GraphQL request, in order of preference
+README_NAMES = ("README.md", "readme.md", "README.rst")
+
+GRAPHQL_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    name
+    description
+    url
+    licenseInfo { spdxId }
+    primaryLanguage { name }
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+""" + "".join(
+    f'    readme{i}: object(expression: "HEAD:{fname}") {{ ... on Blob {{ text }} }}\n'
+    for i, fname in enumerate(README_NAMES)
+) + """  }
+}
+"""
+
+def github_graphql(owner, repo, token):
+    """
+    Fetching repo metadata and README in a single GraphQL call.
+    Returns (meta, readme_md) with meta shaped like the REST repo response;
+    readme_md is the first of README_NAMES found at HEAD, or "" if none is.
+    """
+    resp = _SESSION.post(
+        "https://api.github.com/graphql",
+        json={"query": GRAPHQL_QUERY, "variables": {"owner": owner, "name": repo}},
+        headers={"Authorization": f"bearer {token}"},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    payload = resp.json()
+    if payload.get("errors"):
+        raise RuntimeError(f"GitHub GraphQL error: {payload['errors'][0].get('message')}")
+
+    data = payload["data"]["repository"]
+    license_info = data.get("licenseInfo")
+    language = data.get("primaryLanguage")
+    meta = {
+        "name": data["name"],
+        "description": data["description"],
+        "html_url": data["url"],
+        # REST reports licenses without an SPDX id ("Other") as NOASSERTION
+        "license": {"spdx_id": license_info["spdxId"] or "NOASSERTION"} if license_info else None,
+        "language": language["name"] if language else None,
+        "topics": [n["topic"]["name"] for n in data["repositoryTopics"]["nodes"]],
+    }
+    # blob text is already decoded, and null for binary files
+    readme = next(
+        (blob["text"] for i in range(len(README_NAMES))
+         if (blob := data.get(f"readme{i}")) and blob.get("text") is not None),
+        "",
+    )
+    return meta, readme
 
 
 
 # Markdown parsing helpers
 
+# The parser config is static, so build its rule chains once and reuse them
+_MD = MarkdownIt()
+
 def parse_md(md_text):
     """Turning Markdown text into a syntax tree."""
-    parser = MarkdownIt()
-    return SyntaxTreeNode(parser.parse(md_text))
+    return SyntaxTreeNode(_MD.parse(md_text))
+
+FEATURE_KEYWORDS = ["feature", "key feature"]
+PLATFORM_KEYWORDS = ["supported platform", "compatibility"]
+
+def keyword_pattern(keywords):
+    """One compiled alternation, so a heading is scanned once rather than once per keyword."""
+    return re.compile("|".join(map(re.escape, (kw.lower() for kw in keywords))))
+
+FEATURE_RE = keyword_pattern(FEATURE_KEYWORDS)
+PLATFORM_RE = keyword_pattern(PLATFORM_KEYWORDS)
+
+# ParsedReadme field -> pattern for the headings that introduce its bullet list
+LIST_SECTIONS = (("features", FEATURE_RE), ("platforms", PLATFORM_RE))
+
+@dataclass
+class ParsedReadme:
+    """The README sections build_jsonld needs, collected in one walk."""
+    install_cmds: list = field(default_factory=list)
+    features: list = field(default_factory=list)
+    platforms: list = field(default_factory=list)
+
+def inline_text(node):
+    """Raw Markdown source of a heading or paragraph, which markdown-it keeps in its inline child."""
+    return "".join(c.content for c in node.children).strip()
+
+def plain_text(node):
+    """Joining all text pieces below a node (a list item, a paragraph), without the Markdown markup."""
+    # explicit stack instead of the recursive node.walk() generators,
+    # children pushed reversed so the text stays in document order
+    pieces = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.type == "text":
+            pieces.append(node.content)
+        else:
+            # line breaks and block boundaries (e.g. a nested list) separate words
+            if node.block or node.type in ("softbreak", "hardbreak"):
+                pieces.append(" ")
+            stack.extend(reversed(node.children))
+    return " ".join("".join(pieces).split())
 
 def first_para_after_title(ast):
-    """Grabing the first paragraph after the H1 title."""
+    """
+    Grabbing the first paragraph after the H1 title.
+    Only top-level blocks are looked at, and the scan stops at that paragraph.
+    """
+    title_seen = False
     for node in ast.children:
-        if node.type == "heading" and node.level == 1:
-            siblings = node.parent.children
-            idx = siblings.index(node)
-            for nxt in siblings[idx+1:]:
-                if nxt.type == "paragraph":
-                    return nxt.content.strip()
+        if node.type == "heading" and node.tag == "h1":
+            title_seen = True
+        elif title_seen and node.type == "paragraph":
+            return plain_text(node)
     return None
 
-def find_install_cmds(ast):
-    """Looking for pip install commands in fenced code blocks."""
-    cmds = []
-    for node in ast.walk():
-        if node.type == "fence" and "pip install" in node.content:
-            for line in node.content.splitlines():
-                if "pip install" in line:
-                    cmds.append(line.strip())
-    # preserve order, drop duplicates
-    return list(dict.fromkeys(cmds))
-
-def list_after_heading(ast, keywords):
+def _on_heading(node, parsed, state):
+    if node.tag in ("h2", "h3"):
+        heading_text = inline_text(node).lower()
+        for attr, pattern in LIST_SECTIONS:
+            if pattern.search(heading_text):
+                candidates = state["candidates"][attr]
+                # an earlier heading in the same container already claims its next list
+                if not any(parent is node.parent for parent, _ in candidates):
+                    candidates.append([node.parent, None])
+
+def _on_fence(node, parsed, state):
+    # pip install commands in fenced code blocks
+    if "pip install" in node.content:
+        for line in node.content.splitlines():
+            if "pip install" in line:
+                cmd = line.strip()
+                # preserve order, drop duplicates
+                if cmd not in state["seen_cmds"]:
+                    state["seen_cmds"].add(cmd)
+                    parsed.install_cmds.append(cmd)
+
+def _on_bullet_list(node, parsed, state):
+    # the first bullet list following a matching heading at the same level
+    items = None
+    for candidates in state["candidates"].values():
+        for candidate in candidates:
+            if candidate[1] is None and candidate[0] is node.parent:
+                if items is None:
+                    items = [text for item in node.children if (text := plain_text(item))]
+                candidate[1] = items
+
+_NODE_HANDLERS = {
+    "heading": _on_heading,
+    "fence": _on_fence,
+    "bullet_list": _on_bullet_list,
+}
+
+def scan_readme(ast):
     """
-    Finding a bullet list right after a heading containing any of the given keywords.
-    Matching is case-insensitive and partial.
+    Extracting install commands, features and platforms in a single walk.
+    Heading matching is case-insensitive and partial.
     """
-    keys_lower = [kw.lower() for kw in keywords]
+    parsed = ParsedReadme()
+    # per section: [container, list items] for each matching heading, in walk order
+    state = {"candidates": {attr: [] for attr, _ in LIST_SECTIONS}, "seen_cmds": set()}
     for node in ast.walk():
-        if node.type == "heading" and node.level in (2, 3):
-            heading_text = node.content.strip().lower()
-            if any(kw in heading_text for kw in keys_lower):
-                siblings = node.parent.children
-                idx = siblings.index(node)
-                for nxt in siblings[idx+1:]:
-                    if nxt.type == "bullet_list":
-                        items = []
-                        for item in nxt.children:
-                            text = " ".join(
-                                c.content.strip() for c in item.walk() if c.type == "text"
-                            )
-                            if text:
-                                items.append(text)
-                        return items
-    return []
+        handler = _NODE_HANDLERS.get(node.type)
+        if handler:
+            handler(node, parsed, state)
+    # an inner container's list can be walked before the outer one's, so the
+    # first matching heading that got a list wins, not the first list seen
+    for attr, candidates in state["candidates"].items():
+        setattr(parsed, attr, next((items for _, items in candidates if items is not None), []))
+    return parsed
 
 
 # JSON-LD builder
@@ -99,68 +285,66 @@ CONTEXT = {
     "spdx": "https://spdx.org/licenses/"
 }
 
+def item_list(node_id, name, items):
+    return {
+        "@id": node_id,
+        "@type": "ItemList",
+        "name": name,
+        "itemListElement": [
+            {"@type": "ListItem", "position": i+1, "name": item}
+            for i, item in enumerate(items)
+        ]
+    }
+
 def build_jsonld(meta, ast):
     now = datetime.now(timezone.utc).isoformat()
+    readme = scan_readme(ast)
     repo_url = meta["html_url"]
     name = meta["name"]
-    description = meta["description"] or first_para_after_title(ast)
+    if meta["description"]:
+        description = meta["description"]
+    else:
+        description = first_para_after_title(ast)
     license_info = meta.get("license")
     topics = meta.get("topics", [])
     language = meta.get("language", "Python")
 
-    install_cmds = find_install_cmds(ast)
-    features = list_after_heading(ast, ["feature", "key feature"])
-    platforms = list_after_heading(ast, ["supported platform", "compatibility"])
-
-    root = {
-        "@id": repo_url,
-        "@type": ["SoftwareApplication", "doap:Project"],
-        "name": name,
-        "description": description,
-        "codeRepository": repo_url,
-        "programmingLanguage": language,
-        "applicationCategory": topics or None,
-        "license": {"@id": f"https://spdx.org/licenses/{license_info['spdx_id']}.html"} if license_info else None,
-        "hasPart": []
-    }
+    install_cmds = readme.install_cmds
+    features = readme.features
+    platforms = readme.platforms
 
-    graph = [root]
+    # (id, node) for every sub-node, so hasPart and @graph are each built in one go
+    parts = []
 
     if install_cmds:
         howto_id = f"{repo_url}#howto-install"
-        root["hasPart"].append(howto_id)
-        graph.append({
+        parts.append((howto_id, {
             "@id": howto_id,
             "@type": "HowTo",
             "name": f"Install {name}",
             "tool": install_cmds
-        })
+        }))
 
     if features:
         feat_id = f"{repo_url}#features"
-        root["hasPart"].append(feat_id)
-        graph.append({
-            "@id": feat_id,
-            "@type": "ItemList",
-            "name": "Key Features",
-            "itemListElement": [
-                {"@type": "ListItem", "position": i+1, "name": f}
-                for i, f in enumerate(features)
-            ]
-        })
+        parts.append((feat_id, item_list(feat_id, "Key Features", features)))
 
     if platforms:
         plat_id = f"{repo_url}#supported-platforms"
-        root["hasPart"].append(plat_id)
-        graph.append({
-            "@id": plat_id,
-            "@type": "ItemList",
-            "name": "Supported Platforms",
-            "itemListElement": [
-                {"@type": "ListItem", "position": i+1, "name": p}
-                for i, p in enumerate(platforms)
-            ]
-        })
+        parts.append((plat_id, item_list(plat_id, "Supported Platforms", platforms)))
+
+    root = {
+        "@id": repo_url,
+        "@type": ["SoftwareApplication", "doap:Project"],
+        "name": name,
+        "description": description,
+        "codeRepository": repo_url,
+        "programmingLanguage": language,
+        "applicationCategory": topics or None,
+        "license": {"@id": f"https://spdx.org/licenses/{license_info['spdx_id']}.html"} if license_info else None,
+        "hasPart": [pid for pid, _ in parts]
+    }
+    graph = [root, *(node for _, node in parts)]
 
     return {
         "@context": CONTEXT,
@@ -181,13 +365,23 @@ def main():
     args = parser.parse_args()
 
     owner, repo = args.repo.split("/", 1)
-    meta = get_repo_info(owner, repo, args.token)
-    readme_md = get_readme(owner, repo, args.token)
+    if args.token:
+        # GraphQL needs auth, but gets metadata and README in one request.
+        # A POST can't be revalidated, so this path trades the ETag cache for
+        # a single round trip and one rate-limit point.
+        meta, readme_md = github_graphql(owner, repo, args.token)
+    else:
+        # The two API calls are independent, so overlap their network wait
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            meta_future = ex.submit(get_repo_info, owner, repo, args.token)
+            readme_future = ex.submit(get_readme, owner, repo, args.token)
+            meta = meta_future.result()
+            readme_md = readme_future.result()
     ast = parse_md(readme_md)
     doc = build_jsonld(meta, ast)
 
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(doc, f, ensure_ascii=False, indent=2)
+    with open(args.out, "wb") as f:
+        f.write(orjson.dumps(doc, option=orjson.OPT_INDENT_2))
     print(f"Knowledge graph saved to {args.out}")
 
 if __name__ == "__main__":
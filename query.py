@@ -6,47 +6,106 @@ questions about the project.
 """
 
 import argparse
-import json
+import hashlib
+import mmap
+import os
+import pickle
+import re
+import tempfile
 from pathlib import Path
-from collections import defaultdict
+from collections import Counter
 
+import orjson
 
-# JSON-LD navigation helpers
-
-def graph_nodes(doc):
-    return doc.get("@graph", [])
-
-def project_node(doc):
-    for n in graph_nodes(doc):
-        types = n.get("@type", [])
-        if isinstance(types, str):
-            types = [types]
-        if "SoftwareApplication" in types:
-            return n
-    return {}
 
-def node_by_id(doc, node_id):
-    return next((n for n in graph_nodes(doc) if n.get("@id") == node_id), {})
+# JSON-LD navigation helpers
 
-def install_node(doc):
-    proj = project_node(doc)
-    for pid in proj.get("hasPart", []):
-        n = node_by_id(doc, pid)
+class GraphIndex:
+    """Lookup tables over a JSON-LD @graph, built once so questions don't rescan it."""
+
+    def __init__(self, doc):
+        self.nodes = doc.get("@graph", [])
+        self.by_id = {}
+        self.by_type = {}
+        for n in self.nodes:
+            if "@id" in n:
+                self.by_id.setdefault(n["@id"], n)
+            types = n.get("@type", [])
+            if isinstance(types, str):
+                types = [types]
+            for t in types:
+                self.by_type.setdefault(t, []).append(n)
+        self.project = next(iter(self.by_type.get("SoftwareApplication", [])), {})
+        # every FIELDS entry rendered and tokenized up front, see field_chunks()
+        self.fields = field_chunks(self)
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilding an index from its pickled vars(), without re-indexing."""
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+# Pickled (format version, content digest, vars(GraphIndex)) of the last JSON-LD file
+# loaded. Only plain containers are stored, not the class, which lives in __main__
+# when run as a script and in `query` when imported.
+INDEX_CACHE = Path.home() / ".cache" / "frequenz-jsonld" / "index.pkl"
+INDEX_VERSION = 3
+
+def load_index(path):
+    """Loading the GraphIndex for a JSON-LD file, reusing the cached one if the file is unchanged."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        digest = hashlib.blake2b(mm).hexdigest()
+        try:
+            with open(INDEX_CACHE, "rb") as c:
+                cached = pickle.load(c)
+            if (isinstance(cached, tuple) and len(cached) == 3
+                    and cached[0] == INDEX_VERSION and cached[1] == digest
+                    and isinstance(cached[2], dict)):
+                return GraphIndex.from_state(cached[2])
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+                TypeError, ValueError):
+            pass  # no cache yet, or unreadable / written by an incompatible version
+        doc = orjson.loads(mm[:])
+
+    index = GraphIndex(doc)
+    tmp = None
+    try:
+        INDEX_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        # a private temp file per run, so concurrent runs never write the same file
+        with tempfile.NamedTemporaryFile(dir=INDEX_CACHE.parent, suffix=".tmp", delete=False) as c:
+            tmp = c.name
+            pickle.dump((INDEX_VERSION, digest, vars(index)), c, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, INDEX_CACHE)
+    except OSError:
+        # the cache is only an optimisation
+        if tmp:
+            Path(tmp).unlink(missing_ok=True)
+    return index
+
+def project_node(g):
+    return g.project
+
+def node_by_id(g, node_id):
+    return g.by_id.get(node_id, {})
+
+def install_node(g):
+    for pid in g.project.get("hasPart", []):
+        n = node_by_id(g, pid)
         if n.get("@type") == "HowTo":
             return n
     return {}
 
-def itemlist_by_name(doc, keyword):
+def itemlist_by_name(g, keyword):
     """Find an ItemList whose name contains the keyword (case-insensitive)."""
-    for n in graph_nodes(doc):
-        if n.get("@type") == "ItemList" and keyword.lower() in (n.get("name") or "").lower():
+    for n in g.by_type.get("ItemList", []):
+        if keyword.lower() in (n.get("name") or "").lower():
             return n
     return {}
 
-def example_nodes(doc):
-    proj = project_node(doc)
-    return [node_by_id(doc, pid) for pid in proj.get("hasPart", [])
-            if node_by_id(doc, pid).get("@type") == "CreativeWork"]
+def example_nodes(g):
+    parts = (node_by_id(g, pid) for pid in g.project.get("hasPart", []))
+    return [n for n in parts if n.get("@type") == "CreativeWork"]
 
 def license_text(lic):
     if isinstance(lic, dict) and "@id" in lic:
@@ -79,6 +138,14 @@ INTENT_KEYWORDS = {
     "topics": ["topic", "category", "tags", "keywords"],
 }
 
+# All intent keywords in one alternation, scanned in a single pass over the query.
+# The lookahead keeps matches zero-width so overlapping keywords are all seen
+# ("purpose" also contains "os"), longest first where two start at the same spot.
+_KEY_TO_INTENT = {k: intent for intent, keys in INTENT_KEYWORDS.items() for k in keys}
+_INTENT_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_KEY_TO_INTENT, key=len, reverse=True))) + "))"
+)
+
 INTENT_FIELD_WEIGHTS = {
     "purpose": {"project:description": 3, "project:name": 1},
     "install": {"install:commands": 3},
@@ -93,21 +160,24 @@ INTENT_FIELD_WEIGHTS = {
 # Retrieval logic
 
 def tokenize(text):
-    return [t.lower() for t in text.split()]
-
-def score_chunk(query, text):
-    if not text:
-        return 0
-    qtokens = tokenize(query)
-    ttokens = tokenize(text)
-    tf = defaultdict(int)
-    for t in ttokens:
-        tf[t] += 1
-    return sum(tf.get(q, 0) for q in qtokens)
+    # lowercasing the whole string once beats a per-token .lower() call
+    return text.lower().split()
+
+def term_counts(text):
+    # Counter counts in C instead of a bytecode loop over the tokens
+    return Counter(tokenize(text))
+
+def field_chunks(index):
+    """Rendering every non-empty FIELDS entry once, as {label: (text, term counts)}."""
+    return {label: (text, term_counts(text)) for label, getter in FIELDS if (text := getter(index))}
+
+def score_chunk(qtokens, tf):
+    """Counting how often the (pre-tokenized) query terms occur, given the chunk's term counts."""
+    return sum(tf[q] for q in qtokens)
 
 def guess_intents(query):
-    ql = query.lower()
-    hits = [intent for intent, keys in INTENT_KEYWORDS.items() if any(k in ql for k in keys)]
+    found = {_KEY_TO_INTENT[m.group(1)] for m in _INTENT_RE.finditer(query.lower())}
+    hits = [intent for intent in INTENT_KEYWORDS if intent in found]
     return hits or ["purpose"]
 
 def format_answer(label, content):
@@ -130,19 +200,20 @@ def main():
         print(f" Can't find {path}")
         return
 
-    doc = json.loads(path.read_text(encoding="utf-8"))
+    index = load_index(path)
     intents = guess_intents(args.question)
+    qtokens = tokenize(args.question)
 
-    # Gathering all candidate chunks
-    chunks = [(label, getter(doc)) for label, getter in FIELDS if getter(doc)]
+    # Gathering all candidate chunks, already rendered and tokenized with the index
+    chunks = [(label, *index.fields[label]) for label, _ in FIELDS if label in index.fields]
     if not chunks:
         print("No knowledge found in the JSON-LD.")
         return
 
     # Picking the best match
     best_label, best_content, best_score = None, None, -1
-    for label, content in chunks:
-        base = score_chunk(args.question, content)
+    for label, content, tf in chunks:
+        base = score_chunk(qtokens, tf)
         weight = 1
         for intent in intents:
             weight += INTENT_FIELD_WEIGHTS.get(intent, {}).get(label, 0)